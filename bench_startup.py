@@ -0,0 +1,114 @@
+"""Startup benchmark: import time, time-to-first-paint and heavy-import guard.
+
+    python bench_startup.py [--runs 5]
+
+Each measurement runs in a fresh interpreter and the median is reported. Exits
+non-zero when a budget is exceeded or when pandas/yt_dlp are imported on the
+startup path, so it can gate changes to spotube_app.py and spotube_cli.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Budgets in seconds; generous enough for slow CI machines, tight enough to catch
+# pandas or yt_dlp sneaking back onto the startup path.
+IMPORT_BUDGET = 1.0
+FIRST_PAINT_BUDGET = 2.0
+CLI_HELP_BUDGET = 0.5
+
+HEAVY_MODULES = ('pandas', 'yt_dlp', 'requests', 'fetcher_core', 'downloader_core', 'pipeline_core')
+
+IMPORT_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import spotube_app
+elapsed = time.perf_counter() - t
+print(json.dumps({'seconds': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+PAINT_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+from PyQt5 import QtWidgets, QtCore
+import spotube_app
+
+class FirstPaint(QtCore.QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint:
+            print(json.dumps({'seconds': time.perf_counter() - t, 'heavy': [m for m in %r if m in sys.modules]}))
+            sys.stdout.flush()
+            app.quit()
+        return False
+
+app = QtWidgets.QApplication(sys.argv)
+window = spotube_app.SpotubeApp()
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+QtCore.QTimer.singleShot(10000, app.quit)
+app.exec_()
+""" % (HEAVY_MODULES,)
+
+CLI_PROBE = """
+import json, sys, time, contextlib, io
+t = time.perf_counter()
+import spotube_cli
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        spotube_cli.main(['--help'])
+    except SystemExit:
+        pass
+print(json.dumps({'seconds': time.perf_counter() - t, 'heavy': [m for m in %r + ('PyQt5',) if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(probe, runs):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    samples = []
+    heavy = set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', probe], cwd=HERE, env=env, capture_output=True, text=True)
+        if out.returncode != 0 or not out.stdout.strip():
+            raise RuntimeError(out.stderr.strip() or 'probe produced no output')
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        heavy.update(result['heavy'])
+    return statistics.median(samples), sorted(heavy)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    ok = True
+    for name, probe, budget in (
+        ('import spotube_app', IMPORT_PROBE, IMPORT_BUDGET),
+        ('time to first paint', PAINT_PROBE, FIRST_PAINT_BUDGET),
+        ('spotube_cli --help', CLI_PROBE, CLI_HELP_BUDGET),
+    ):
+        try:
+            seconds, heavy = measure(probe, args.runs)
+        except RuntimeError as e:
+            print(f'{name:<22} ERROR  {e}')
+            ok = False
+            continue
+        status = 'ok'
+        if seconds > budget:
+            status = 'SLOW'
+            ok = False
+        if heavy:
+            status = 'HEAVY'
+            ok = False
+        print(f'{name:<22} {seconds * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)  {status}'
+              + (f"  eager imports: {', '.join(heavy)}" if heavy else ''))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,17 @@
 import yt_dlp
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from library_core import AudioLibrary, DEFAULT_LIBRARY_DIR, video_id_from_url, write_m3u
+from scheduler_core import DownloadScheduler, ReadyQueue, estimate_size
 
 MAX_DOWNLOAD_THREADS = 6
+PROBE_MAX_AGE = 2 * 60 * 60  # YouTube stream URLs stay valid for roughly six hours
 
-def _download_single(url, output_dir, audio_format):
-    url = str(url)
-    ydl_opts = {
+def _ydl_opts(library, audio_format, scheduler=None):
+    opts = {
         'format': 'bestaudio/best',
-        'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+        'outtmpl': os.path.join(library.root, '%(id)s.%(ext)s'),
         'quiet': True,
         'noplaylist': True,
         'postprocessors': [{
@@ -18,40 +20,128 @@ def _download_single(url, output_dir, audio_format):
             'preferredquality': '192',
         }],
     }
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+    if scheduler is not None:
+        opts['progress_hooks'] = [scheduler.progress_hook()]
+    return opts
 
 
-def download_audio(urls, output_dir, progress_callback, pause_event, stop_event, thread_count=1, audio_format='mp3'):
+def _probe(url, library, audio_format):
+    """Fetch (info, probed_at) for url, or None when it is already in the library."""
+    video_id = video_id_from_url(url)
+    if video_id and library.has(video_id, audio_format):
+        return None
+    with yt_dlp.YoutubeDL(_ydl_opts(library, audio_format)) as ydl:
+        return ydl.extract_info(str(url), download=False), time.time()
+
+
+def _download_single(url, probe, library, audio_format, scheduler, stop_event):
+    if probe is None:
+        return video_id_from_url(url), True
+    info, probed_at = probe
+    video_id = info['id']
+    with library.entry_lock(video_id, audio_format):
+        if library.has(video_id, audio_format):
+            return video_id, True
+        with scheduler.reserve(estimate_size(info, audio_format), stop_event):
+            with yt_dlp.YoutubeDL(_ydl_opts(library, audio_format, scheduler)) as ydl:
+                if time.time() - probed_at > PROBE_MAX_AGE:
+                    # The probe's stream URLs have likely expired; extract them again
+                    ydl.extract_info(str(url), download=True)
+                else:
+                    ydl.process_ie_result(info, download=True)
+    library.add_entry(video_id, audio_format, info.get('title') or video_id)
+    return video_id, False
+
+
+def _download_next(ready, library, audio_format, scheduler, pause_event, stop_event):
+    """Download whichever probed item has the highest priority when this task starts.
+
+    Returns (url, (video_id, from_library), None) or (url, None, error).
+    """
+    url, probe = ready.pop()
+    while pause_event.is_set() and not stop_event.is_set():
+        time.sleep(0.5)
+    if stop_event.is_set():
+        return url, None, InterruptedError('Download stopped by user.')
+    try:
+        return url, _download_single(url, probe, library, audio_format, scheduler, stop_event), None
+    except Exception as e:
+        return url, None, e
+
+
+def download_audio(urls, output_dir, progress_callback, pause_event, stop_event, thread_count=1, audio_format='mp3', library_dir=DEFAULT_LIBRARY_DIR, bandwidth_limit=None, priority='input'):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     total = len(urls)
     completed = 0
     failed = 0
-    results = []
+    from_cache = 0
+    linked = {}
     def log(msg):
         progress_callback({'type': 'log', 'msg': msg})
     if total == 0:
         log('No URLs to download.')
         return
-    with ThreadPoolExecutor(max_workers=thread_count) as executor:
-        future_to_url = {executor.submit(_download_single, url, output_dir, audio_format): url for url in urls}
-        for i, future in enumerate(as_completed(future_to_url), 1):
-            url = future_to_url[future]
+    started = time.time()
+    library = AudioLibrary(library_dir)
+    library.register_playlist(output_dir)
+    scheduler = DownloadScheduler(library.root, bandwidth_limit, priority)
+    ready = ReadyQueue()
+    # Each finished probe queues its item and one download task; the task picks the
+    # best item available when it starts, so downloads begin before probing ends
+    with ThreadPoolExecutor(max_workers=thread_count) as probes, ThreadPoolExecutor(max_workers=thread_count) as downloads:
+        probe_to_url = {probes.submit(_probe, url, library, audio_format): (i, url) for i, url in enumerate(urls)}
+        pending = set(probe_to_url)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
             if stop_event.is_set():
                 log('Download stopped by user.')
                 # Cancel all remaining futures
-                for fut in future_to_url:
+                for fut in pending:
                     fut.cancel()
                 break
             while pause_event.is_set():
                 time.sleep(0.5)
-            try:
-                future.result()
-                completed += 1
-                log(f'Downloaded {url} ({i}/{total})')
-            except Exception as e:
-                failed += 1
-                log(f'Failed to download {url}: {e}')
-            progress_callback({'type': 'progress', 'completed': completed, 'failed': failed, 'total': total})
-    log(f'Download complete. {completed} succeeded, {failed} failed.') 
\ No newline at end of file
+            for future in done:
+                if future in probe_to_url:
+                    position, url = probe_to_url[future]
+                    try:
+                        probe = future.result()
+                    except Exception as e:
+                        failed += 1
+                        log(f'Failed to download {url}: {e}')
+                        progress_callback({'type': 'progress', 'completed': completed, 'failed': failed, 'total': total})
+                        continue
+                    # Library hits go first: they only need linking
+                    key = (0,) if probe is None else (1,) + scheduler.priority_key(position, probe[0], audio_format)
+                    ready.push(key, (url, probe))
+                    pending.add(downloads.submit(_download_next, ready, library, audio_format, scheduler, pause_event, stop_event))
+                    continue
+                i = completed + failed + 1
+                url, result, error = future.result()
+                try:
+                    if error is not None:
+                        raise error
+                    video_id, from_library = result
+                    linked[str(url)] = (library.title(video_id), library.link_into(video_id, audio_format, output_dir))
+                    completed += 1
+                    if from_library:
+                        from_cache += 1
+                        log(f'Linked {url} from library ({i}/{total})')
+                    else:
+                        log(f'Downloaded {url} ({i}/{total})')
+                except Exception as e:
+                    failed += 1
+                    log(f'Failed to download {url}: {e}')
+                progress_callback({'type': 'progress', 'completed': completed, 'failed': failed, 'total': total})
+    library.save()
+    # A stopped run only linked part of the playlist; keep the previous M3U
+    if linked and not stop_event.is_set():
+        m3u_path = os.path.join(output_dir, os.path.basename(os.path.normpath(output_dir)) + '.m3u')
+        write_m3u(m3u_path, [linked[str(u)] for u in urls if str(u) in linked])
+        log(f'Playlist written to {m3u_path}')
+    if not stop_event.is_set():
+        removed = library.collect_garbage(before=started)
+        if removed:
+            log(f'Removed {len(removed)} orphaned library entries.')
+    log(f'Download complete. {completed} succeeded ({from_cache} from library), {failed} failed.')
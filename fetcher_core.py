@@ -4,6 +4,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
 import os
 import time
+from retry_core import RetryQueue, MAX_RETRY_ATTEMPTS, retry_queue_path as default_retry_queue_path
+from store_core import open_link_store, link_store_path
+from sync_core import track_query
 
 def clean_query(query):
     query = re.sub(r"\([^)]*\)", "", query)
@@ -21,79 +24,125 @@ def alternate_queries(query):
         alternates.append(f"{track} - {artist}")
     return list(dict.fromkeys(alternates))
 
-def get_youtube_link(query):
+def search_youtube_link(query):
+    """Return (url, reason); url is "FAILED" and reason explains why when no match is found."""
     ydl_opts = {
         'quiet': True,
         'skip_download': True,
         'extract_flat': 'in_playlist',
         'default_search': 'ytsearch1',
     }
+    reason = 'no results'
     for alt_query in alternate_queries(query):
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             try:
                 result = ydl.extract_info(alt_query, download=False)
                 if 'entries' in result and result['entries']:
-                    return f"https://www.youtube.com/watch?v={result['entries'][0]['id']}"
-            except Exception:
+                    return f"https://www.youtube.com/watch?v={result['entries'][0]['id']}", None
+            except Exception as e:
+                reason = str(e) or type(e).__name__
                 continue
-    return "FAILED"
+    return "FAILED", reason
 
-def run_fetch(input_csv, output_csv, failed_csv, progress_callback, pause_event, stop_event, max_threads=3):
-    try:
-        df = pd.read_csv(input_csv, sep=None, engine="python")
-    except Exception as e:
-        progress_callback({'type': 'error', 'msg': f"Error reading input CSV: {e}"})
-        return
-    queries = [f"{r['Artist Name(s)']} - {r['Track Name']}" for _, r in df.iterrows()]
-    existing = set()
-    if os.path.exists(output_csv):
+def run_fetch(input_csv, output_csv, failed_csv, progress_callback, pause_event, stop_event, max_threads=3, retry_queue_path=None, max_attempts=MAX_RETRY_ATTEMPTS, ignore_backoff=False, link_store=None, queries=None, refresh=()):
+    # Searches the given queries, or those read from input_csv; with neither, only due
+    # retries are worked through. ignore_backoff marks a manual retry: queries are searched
+    # regardless of their backoff and failures don't count towards max_attempts. Queries in
+    # refresh are searched again even when they already have a link, which is kept if the
+    # new search fails.
+    if queries is not None:
+        queries = [str(q) for q in queries]
+    elif input_csv:
         try:
-            out_df = pd.read_csv(output_csv)
-            existing = set(out_df['query'])
-        except Exception:
-            pass
-    results = []
-    failed = []
-    total = len(queries)
-    completed = 0
-    skipped = 0
-    def log(msg):
-        progress_callback({'type': 'log', 'msg': msg})
-    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        future_to_query = {}
-        for q in queries:
-            if stop_event.is_set():
-                log('🛑 Stopped by user.')
-                break
-            if q in existing:
-                skipped += 1
-                progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
-                log(f"✔️ Skipped: {q} already exists.")
-                continue
-            future = executor.submit(get_youtube_link, q)
-            future_to_query[future] = q
-        for i, future in enumerate(as_completed(future_to_query), 1):
-            while pause_event.is_set():
-                time.sleep(0.5)
-            if stop_event.is_set():
-                log('🛑 Stopped by user.')
-                break
-            query = future_to_query[future]
-            url = future.result()
-            results.append((query, url))
-            completed += 1
-            if url == "FAILED":
-                failed.append(query)
-            progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
-            log(f"{completed}/{len(future_to_query)}: {query} -> {url}")
-    # Append new results to output
-    if results:
-        new_df = pd.DataFrame(results, columns=["query", "url"])
-        if os.path.exists(output_csv):
-            new_df.to_csv(output_csv, mode='a', header=False, index=False)
+            df = pd.read_csv(input_csv, sep=None, engine="python")
+        except Exception as e:
+            progress_callback({'type': 'error', 'msg': f"Error reading input CSV: {e}"})
+            return
+        if 'query' in df.columns:
+            queries = [str(q) for q in df['query']]
         else:
-            new_df.to_csv(output_csv, index=False)
-    if failed:
-        pd.DataFrame(failed, columns=["query"]).to_csv(failed_csv, index=False)
-        log(f"❌ {len(failed)} queries failed. Saved to {failed_csv}")
-    log(f"✅ Done. Links saved to {output_csv}") 
\ No newline at end of file
+            queries = [track_query(r) for _, r in df.iterrows()]
+    else:
+        queries = []
+    if link_store is None:
+        link_store = link_store_path(output_csv)
+    with open_link_store(link_store, import_csv=output_csv) as store:
+        if retry_queue_path is None:
+            retry_queue_path = default_retry_queue_path(output_csv)
+        retry_queue = RetryQueue(retry_queue_path, max_attempts)
+        # FAILED rows that predate the retry queue (e.g. imported from an old links CSV) join it as due
+        for q in store.failed():
+            if q not in retry_queue.entries:
+                retry_queue.record_failure(q, 'failed in an earlier run', now=0)
+        # Due retries from earlier runs go to the back of the queue
+        queued = set(queries)
+        queries += [q for q in retry_queue.due() if q not in queued]
+        missing = set(store.missing(queries))
+        queries = [q for q in queries if q in queued or q in missing]
+        results = []
+        failed = []
+        total = len(queries)
+        completed = 0
+        skipped = 0
+        deferred = 0
+        def log(msg):
+            progress_callback({'type': 'log', 'msg': msg})
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            future_to_query = {}
+            for q in queries:
+                if stop_event.is_set():
+                    log('🛑 Stopped by user.')
+                    break
+                if q not in missing and q not in refresh:
+                    skipped += 1
+                    progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
+                    log(f"✔️ Skipped: {q} already exists.")
+                    continue
+                if retry_queue.is_given_up(q):
+                    skipped += 1
+                    progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
+                    log(f"⏭️ Skipped: {q} gave up after {max_attempts} attempts.")
+                    continue
+                if not ignore_backoff and not retry_queue.is_due(q):
+                    skipped += 1
+                    deferred += 1
+                    progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
+                    continue
+                future = executor.submit(search_youtube_link, q)
+                future_to_query[future] = q
+            for i, future in enumerate(as_completed(future_to_query), 1):
+                while pause_event.is_set():
+                    time.sleep(0.5)
+                if stop_event.is_set():
+                    log('🛑 Stopped by user.')
+                    break
+                query = future_to_query[future]
+                url, reason = future.result()
+                completed += 1
+                if url == "FAILED" and query not in missing:
+                    log(f"{completed}/{len(future_to_query)}: {query} -> no new match, keeping the existing link")
+                    progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
+                    continue
+                results.append((query, url))
+                if url == "FAILED":
+                    failed.append(query)
+                    retry_queue.record_failure(query, reason, count_attempt=not ignore_backoff)
+                else:
+                    retry_queue.resolve(query)
+                progress_callback({'type': 'progress', 'completed': completed, 'skipped': skipped, 'failed': len(failed), 'total': total})
+                log(f"{completed}/{len(future_to_query)}: {query} -> {url}")
+        # Upsert into the store and re-export the deduplicated CSV
+        if results:
+            store.upsert(results)
+        if os.path.abspath(link_store) != os.path.abspath(output_csv):
+            store.export_csv(output_csv)
+        retry_queue.save()
+        if deferred:
+            log(f"⏳ {deferred} queries waiting for their next retry window.")
+        if retry_queue.entries:
+            pd.DataFrame(retry_queue.rows(), columns=["query", "reason", "attempts", "next_attempt", "given_up"]).to_csv(failed_csv, index=False)
+        elif os.path.exists(failed_csv):
+            os.remove(failed_csv)
+        if failed:
+            log(f"❌ {len(failed)} queries failed. Saved to {failed_csv}")
+        log(f"✅ Done. Links saved to {output_csv}")
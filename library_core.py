@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import shutil
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_LIBRARY_DIR = os.path.join(os.path.expanduser('~'), '.spotube', 'library')
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+LOCK_TIMEOUT = 60
+LOCK_STALE_AFTER = 10 * 60
+ENTRY_RE = re.compile(r'^[A-Za-z0-9_-]+\.[A-Za-z0-9]+$')
+
+def video_id_from_url(url):
+    parsed = urlparse(str(url))
+    host = parsed.netloc.lower()
+    if host.endswith('youtu.be'):
+        return parsed.path.strip('/') or None
+    if 'youtube' in host:
+        if parsed.path == '/watch':
+            ids = parse_qs(parsed.query).get('v')
+            return ids[0] if ids else None
+        m = re.match(r"/(?:shorts|embed|v)/([^/?#]+)", parsed.path)
+        if m:
+            return m.group(1)
+    return None
+
+def safe_filename(name):
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', str(name)).strip(' .')
+    return name[:180] or 'untitled'
+
+def link_file(src, dest):
+    """Hardlink src to dest, falling back to a symlink and finally a copy."""
+    try:
+        os.link(src, dest)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(src), dest)
+        return 'symlink'
+    except OSError:
+        pass
+    shutil.copy2(src, dest)
+    return 'copy'
+
+def write_m3u(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n')
+        for title, filename in entries:
+            f.write(f'#EXTINF:-1,{title}\n{filename}\n')
+
+
+class AudioLibrary:
+    """Content-addressed store of downloaded audio, one file per video ID and format.
+
+    Playlist directories never own audio; they hold links into the library so a
+    track shared by many playlists is downloaded and stored once. The index
+    records which entries each playlist links to and under what name, so
+    references survive even when the link had to fall back to a plain copy.
+    Several processes may share a library; index writes and garbage
+    collection are serialised by a lock file.
+    """
+    def __init__(self, root=DEFAULT_LIBRARY_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entry_locks = defaultdict(threading.Lock)
+        index = self._read_index()
+        self.titles = index.get('titles', {})
+        self.entries = set(index.get('entries', []))
+        self.refs = index.get('refs', {})
+
+    def _read_index(self):
+        index_path = os.path.join(self.root, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    @contextmanager
+    def _locked(self):
+        """Hold the library-wide lock file; a lock older than LOCK_STALE_AFTER is taken over."""
+        path = os.path.join(self.root, LOCK_FILE)
+        deadline = time.time() + LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) > LOCK_STALE_AFTER:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f'Library {self.root} is locked by another process')
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _merge_index(self):
+        # Fold in what other processes wrote since we loaded, dropping entries whose file is gone
+        disk = self._read_index()
+        with self._lock:
+            self.titles = {**disk.get('titles', {}), **self.titles}
+            self.entries = {e for e in self.entries | set(disk.get('entries', []))
+                            if os.path.exists(os.path.join(self.root, e))}
+            for playlist_dir, links in disk.get('refs', {}).items():
+                merged = dict(links)
+                merged.update(self.refs.get(playlist_dir, {}))
+                self.refs[playlist_dir] = merged
+
+    def _write_index(self):
+        with self._lock:
+            index = {'titles': self.titles, 'entries': sorted(self.entries), 'refs': self.refs}
+        tmp = os.path.join(self.root, INDEX_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+
+    def entry_name(self, video_id, audio_format):
+        return f'{video_id}.{audio_format}'
+
+    def path_for(self, video_id, audio_format):
+        return os.path.join(self.root, self.entry_name(video_id, audio_format))
+
+    def has(self, video_id, audio_format):
+        return os.path.exists(self.path_for(video_id, audio_format))
+
+    def entry_lock(self, video_id, audio_format):
+        with self._lock:
+            return self._entry_locks[(video_id, audio_format)]
+
+    def add_entry(self, video_id, audio_format, title):
+        with self._lock:
+            self.entries.add(self.entry_name(video_id, audio_format))
+            self.titles[video_id] = title
+
+    def title(self, video_id):
+        return self.titles.get(video_id, video_id)
+
+    def register_playlist(self, playlist_dir):
+        with self._lock:
+            self.refs.setdefault(os.path.abspath(playlist_dir), {})
+
+    def link_into(self, video_id, audio_format, playlist_dir):
+        """Expose a library entry in playlist_dir under its title; returns the file name used."""
+        src = self.path_for(video_id, audio_format)
+        entry = self.entry_name(video_id, audio_format)
+        links = self.refs.setdefault(os.path.abspath(playlist_dir), {})
+        known = links.get(entry)
+        if known and os.path.lexists(os.path.join(playlist_dir, known)):
+            return known
+        base = safe_filename(self.title(video_id))
+        for name in (f'{base}.{audio_format}', f'{base} [{video_id}].{audio_format}'):
+            dest = os.path.join(playlist_dir, name)
+            if os.path.lexists(dest):
+                if not (os.path.exists(dest) and os.path.samefile(src, dest)):
+                    continue
+            else:
+                link_file(src, dest)
+            with self._lock:
+                links[entry] = name
+                self.entries.add(entry)
+            return name
+        raise FileExistsError(f'Cannot link {video_id}: {name} already exists in {playlist_dir}')
+
+    def unlink_from(self, video_id, audio_format, playlist_dir):
+        """Remove the playlist_dir link to a library entry; returns the removed file name or None."""
+        entry = self.entry_name(video_id, audio_format)
+        with self._lock:
+            name = self.refs.get(os.path.abspath(playlist_dir), {}).pop(entry, None)
+        if name is None:
+            return None
+        dest = os.path.join(playlist_dir, name)
+        if os.path.lexists(dest):
+            os.remove(dest)
+        return name
+
+    def save(self):
+        with self._locked():
+            self._merge_index()
+            self._write_index()
+
+    def collect_garbage(self, before):
+        """Delete indexed entries older than before that no playlist directory links to any more.
+
+        A playlist directory that is missing right now (say, on an unplugged
+        drive) keeps all of its references; only links whose directory exists
+        but whose file is gone are dropped. Files the index does not list (in-flight downloads, other runs' unsaved
+        entries, anything not named <id>.<format>) are never touched.
+        """
+        removed = []
+        with self._locked():
+            self._merge_index()
+            referenced = set()
+            for playlist_dir in list(self.refs):
+                links = self.refs[playlist_dir]
+                if not os.path.isdir(playlist_dir):
+                    referenced.update(links)
+                    continue
+                for entry, name in list(links.items()):
+                    if os.path.lexists(os.path.join(playlist_dir, name)):
+                        referenced.add(entry)
+                    else:
+                        del links[entry]
+            for entry in sorted(self.entries - referenced):
+                path = os.path.join(self.root, entry)
+                if not ENTRY_RE.match(entry):
+                    continue
+                try:
+                    if os.path.getmtime(path) >= before:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.entries.discard(entry)
+                removed.append(entry)
+            live_ids = {os.path.splitext(entry)[0] for entry in self.entries}
+            self.titles = {vid: t for vid, t in self.titles.items() if vid in live_ids}
+            self._write_index()
+        return removed
@@ -0,0 +1,178 @@
+import os
+import time
+import pandas as pd
+import fetcher_core
+import downloader_core
+import store_core
+import sync_core
+from library_core import AudioLibrary, video_id_from_url
+from retry_core import RetryQueue, MAX_RETRY_ATTEMPTS, retry_queue_path
+
+def run_pipeline(input_csv, output_csv, failed_csv, progress_callback, pause_event, stop_event, download_audio=False, download_dir=None, thread_count=1, audio_format='opus', bandwidth_limit=None, priority='input', sync=False, remove_deleted=False, max_attempts=MAX_RETRY_ATTEMPTS):
+    def _playlist_dir():
+        # Audio lives in the shared library; each playlist gets its own folder of links
+        return os.path.join(download_dir, store_core.playlist_name(input_csv))
+
+    def _download(urls):
+        downloader_core.download_audio(urls, _playlist_dir(), progress_callback, pause_event, stop_event, thread_count, audio_format,
+                                       bandwidth_limit=bandwidth_limit, priority=priority)
+
+    def _linked_urls():
+        with store_core.open_link_store(store_core.link_store_path(output_csv), import_csv=output_csv) as store:
+            return [u for u in store.urls() if is_valid_yt(u)]
+
+    def _sync(df):
+        # Only tracks added or changed since the last processed export, or still without a link, are searched;
+        # changed tracks are searched again even if they have a link, since the old match may be the wrong recording
+        path = sync_core.snapshot_path(output_csv)
+        old = sync_core.load_snapshot(path)
+        records = df.to_dict('records')
+        new = sync_core.build_snapshot(records)
+        delta = sync_core.diff_snapshots(old, new)
+        progress_callback({'type': 'log', 'msg': sync_core.describe(delta)})
+        with store_core.open_link_store(store_core.link_store_path(output_csv), import_csv=output_csv) as store:
+            unresolved = set(store.missing([entry['query'] for entry in new.values()]))
+        pending = set(delta['added'] + delta['changed'])
+        pending.update(key for key, entry in new.items() if entry['query'] in unresolved)
+        due = RetryQueue(retry_queue_path(output_csv), max_attempts).due()
+        if pending or due:
+            progress_callback({'type': 'log', 'msg': f'Fetching YouTube links for {len(pending)} new, changed or unresolved tracks and {len(due)} due retries (using {thread_count} threads)...'})
+            fetcher_core.run_fetch(None, output_csv, failed_csv, progress_callback, pause_event, stop_event, thread_count,
+                                   max_attempts=max_attempts, queries=[entry['query'] for key, entry in new.items() if key in pending],
+                                   refresh={new[key]['query'] for key in delta['changed']})
+            if stop_event.is_set():
+                return
+        with store_core.open_link_store(store_core.link_store_path(output_csv), import_csv=output_csv) as store:
+            current = store.lookup([entry['query'] for entry in new.values()])
+            stale = store.lookup([old[key]['query'] for key in delta['removed'] + delta['changed']])
+        urls = [current[entry['query']] for entry in new.values() if is_valid_yt(current.get(entry['query']))]
+        if remove_deleted and stale and download_dir:
+            keep = {video_id_from_url(u) for u in urls}
+            started = time.time()
+            library = AudioLibrary()
+            removed = 0
+            for url in stale.values():
+                video_id = video_id_from_url(url)
+                if video_id and video_id not in keep and library.unlink_from(video_id, audio_format, _playlist_dir()):
+                    removed += 1
+            progress_callback({'type': 'log', 'msg': f'Removed {removed} tracks no longer in the playlist.'})
+            library.save()
+            if not (download_audio and urls):
+                # download_audio collects garbage itself, but returns early without URLs
+                library.collect_garbage(before=started)
+        if download_audio:
+            # Unchanged tracks are already in the library, so this only links them and rewrites the M3U
+            progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
+            _download(urls)
+        if not stop_event.is_set():
+            sync_core.save_snapshot(path, new)
+
+    try:
+        df = pd.read_csv(input_csv)
+    except Exception as e:
+        progress_callback({'type': 'error', 'msg': f'Error reading input CSV: {e}'})
+        return
+    cols = set(df.columns)
+    def is_valid_yt(url):
+        s = str(url)
+        return s.startswith('http') and 'youtube' in s.lower()
+
+    if {'Artist Name(s)', 'Track Name'}.issubset(cols):
+        if sync:
+            _sync(df)
+            return
+        if 'url' in cols:
+            to_fetch = df[(df['url'].isna()) | (df['url'] == 'FAILED') | (~df['url'].apply(is_valid_yt))]
+            already_present = len(df) - len(to_fetch)
+            if len(to_fetch) == 0:
+                progress_callback({'type': 'log', 'msg': f'All tracks already have YouTube links ({already_present} present). Skipping fetch.'})
+                if download_audio:
+                    urls = [str(u) for u in df['url'] if is_valid_yt(u)]
+                    progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
+                    _download(urls)
+                return
+            else:
+                progress_callback({'type': 'log', 'msg': f'Fetching {len(to_fetch)} missing YouTube links (using {thread_count} threads)...'})
+                fetcher_core.run_fetch(
+                    None,
+                    output_csv,
+                    failed_csv,
+                    progress_callback,
+                    pause_event,
+                    stop_event,
+                    thread_count,
+                    max_attempts=max_attempts,
+                    queries=[sync_core.track_query(r) for _, r in to_fetch.iterrows()]
+                )
+                if download_audio:
+                    try:
+                        urls = _linked_urls()
+                    except Exception as e:
+                        progress_callback({'type': 'error', 'msg': f'Error reading link store: {e}'})
+                        return
+                    progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
+                    _download(urls)
+                return
+        else:
+            progress_callback({'type': 'log', 'msg': f'Fetching YouTube links for all {len(df)} tracks (using {thread_count} threads)...'})
+            fetcher_core.run_fetch(
+                input_csv,
+                output_csv,
+                failed_csv,
+                progress_callback,
+                pause_event,
+                stop_event,
+                thread_count,
+                max_attempts=max_attempts
+            )
+            if download_audio:
+                try:
+                    urls = _linked_urls()
+                except Exception as e:
+                    progress_callback({'type': 'error', 'msg': f'Error reading link store: {e}'})
+                    return
+                progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
+                _download(urls)
+    elif 'url' in cols:
+        valid_urls = [str(u) for u in df['url'] if is_valid_yt(u)]
+        if len(valid_urls) == 0:
+            progress_callback({'type': 'error', 'msg': 'No valid YouTube links found in input CSV.'})
+            return
+        progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(valid_urls)} tracks...'})
+        _download(valid_urls)
+    elif 'query' in cols:
+        to_fetch = df[(df['url'].isna()) | (df['url'] == 'FAILED') | (~df['url'].apply(is_valid_yt))] if 'url' in cols else df
+        already_present = len(df) - len(to_fetch)
+        retry_queue = RetryQueue(retry_queue_path(output_csv), max_attempts)
+        given_up = to_fetch['query'].astype(str).map(retry_queue.is_given_up)
+        to_fetch = to_fetch[~given_up]
+        if len(to_fetch) == 0:
+            if given_up.any():
+                progress_callback({'type': 'log', 'msg': f'{int(given_up.sum())} failed queries were given up after {max_attempts} attempts; {already_present} already have YouTube links. Skipping fetch.'})
+            else:
+                progress_callback({'type': 'log', 'msg': f'All failed links already have YouTube links ({already_present} present). Skipping fetch.'})
+            return
+        progress_callback({'type': 'log', 'msg': f'Fetching {len(to_fetch)} failed/missing YouTube links (using {thread_count} threads)...'})
+        fetcher_core.run_fetch(
+            None,
+            output_csv,
+            failed_csv,
+            progress_callback,
+            pause_event,
+            stop_event,
+            thread_count,
+            max_attempts=max_attempts,
+            ignore_backoff=True,
+            queries=to_fetch['query']
+        )
+        if download_audio:
+            try:
+                urls = _linked_urls()
+            except Exception as e:
+                progress_callback({'type': 'error', 'msg': f'Error reading link store: {e}'})
+                return
+            progress_callback({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
+            _download(urls)
+    else:
+        progress_callback({'type': 'error', 'msg': 'Unrecognized input CSV format.'})
+        return
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import threading
+
+MAX_RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 60 * 60          # first retry after an hour
+RETRY_MAX_DELAY = 7 * 24 * 60 * 60  # never wait more than a week
+
+def retry_queue_path(output_csv):
+    return os.path.splitext(output_csv)[0] + '.retry.json'
+
+def retry_delay(attempts, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    return min(cap, base * 2 ** max(0, attempts - 1))
+
+
+class RetryQueue:
+    """Durable record of failed queries with exponential backoff.
+
+    Each entry tracks the last failure reason, the number of attempts and the
+    earliest time the query may be searched again. Entries that reach
+    max_attempts are kept but marked as given up so they are never retried.
+    """
+    def __init__(self, path, max_attempts=MAX_RETRY_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception:
+                pass
+
+    def is_given_up(self, query):
+        entry = self.entries.get(query)
+        return bool(entry) and entry['attempts'] >= self.max_attempts
+
+    def is_due(self, query, now=None):
+        entry = self.entries.get(query)
+        if entry is None:
+            return True
+        if entry['attempts'] >= self.max_attempts:
+            return False
+        return entry['next_attempt'] <= (time.time() if now is None else now)
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        return [q for q in self.entries if self.is_due(q, now)]
+
+    def record_failure(self, query, reason, now=None, count_attempt=True):
+        """Record a failed search; manual retries pass count_attempt=False so they never cause a give-up."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.setdefault(query, {'attempts': 0})
+            if count_attempt:
+                entry['attempts'] += 1
+            entry['reason'] = str(reason)
+            entry['last_attempt'] = now
+            entry['next_attempt'] = now + retry_delay(entry['attempts'])
+            return entry
+
+    def resolve(self, query):
+        with self._lock:
+            self.entries.pop(query, None)
+
+    def save(self):
+        with self._lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp, self.path)
+
+    def rows(self):
+        return [
+            (q, e['reason'], e['attempts'], time.strftime('%Y-%m-%d %H:%M', time.localtime(e['next_attempt'])),
+             self.is_given_up(q))
+            for q, e in self.entries.items()
+        ]
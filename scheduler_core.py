@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_FREE_SPACE_MARGIN = 500 * 1024 * 1024  # always leave this much free on disk
+PRIORITIES = ('input', 'shortest', 'smallest')
+
+# Rough output bitrates (kbit/s) used to estimate transcoded file sizes
+FORMAT_BITRATES = {'mp3': 192, 'opus': 160, 'flac': 1000}
+
+
+def estimate_size(info, audio_format):
+    """Estimate bytes needed on disk for a download: the source stream plus the transcoded file."""
+    duration = info.get('duration') or 0
+    source = info.get('filesize') or info.get('filesize_approx')
+    if not source:
+        for fmt in info.get('requested_formats') or []:
+            source = (source or 0) + (fmt.get('filesize') or fmt.get('filesize_approx') or 0)
+    if not source:
+        abr = info.get('abr') or info.get('tbr') or 160
+        source = duration * abr * 1000 / 8
+    output = duration * FORMAT_BITRATES.get(audio_format, 320) * 1000 / 8
+    return int(source + output)
+
+
+class TokenBucket:
+    """Global byte-rate limiter shared by all download threads."""
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        # Debt is allowed so large chunks are paid for by sleeping afterwards
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ReadyQueue:
+    """Thread-safe priority queue of downloads whose probe has finished."""
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, key, item):
+        with self._lock:
+            heapq.heappush(self._heap, (key, next(self._seq), item))
+
+    def pop(self):
+        with self._lock:
+            return heapq.heappop(self._heap)[2]
+
+
+class DownloadScheduler:
+    """Orders downloads and throttles them by shared bandwidth and free disk space.
+
+    bandwidth_limit is in bytes per second (None for unlimited). Before each
+    download, its estimated size is reserved against the free space of
+    download_dir; downloads wait while other reservations are outstanding and
+    fail when the disk is too small even on its own.
+    """
+    def __init__(self, download_dir, bandwidth_limit=None, priority='input', free_space_margin=DEFAULT_FREE_SPACE_MARGIN):
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown download priority: {priority}')
+        self.download_dir = download_dir
+        self.bucket = TokenBucket(bandwidth_limit) if bandwidth_limit else None
+        self.priority = priority
+        self.free_space_margin = free_space_margin
+        self.reserved = 0
+        self._space = threading.Condition()
+
+    def priority_key(self, position, info, audio_format):
+        """Sort key for a probed download; position is its index in the input list."""
+        if self.priority == 'shortest':
+            return (info.get('duration') or float('inf'), position)
+        if self.priority == 'smallest':
+            return (estimate_size(info, audio_format), position)
+        return (position,)
+
+    def available(self):
+        return shutil.disk_usage(self.download_dir).free - self.reserved - self.free_space_margin
+
+    @contextmanager
+    def reserve(self, nbytes, stop_event=None):
+        with self._space:
+            while self.available() < nbytes:
+                if self.reserved == 0:
+                    raise OSError(f'Not enough disk space in {self.download_dir} for an estimated {nbytes // (1024 * 1024)} MB')
+                if stop_event is not None and stop_event.is_set():
+                    raise InterruptedError('Download stopped by user.')
+                self._space.wait(timeout=1)
+            self.reserved += nbytes
+        try:
+            yield
+        finally:
+            with self._space:
+                self.reserved -= nbytes
+                self._space.notify_all()
+
+    def progress_hook(self):
+        """Return a yt_dlp progress hook that charges downloaded bytes to the shared bucket."""
+        seen = {}
+        def hook(d):
+            if self.bucket is None or d.get('status') != 'downloading':
+                return
+            done = d.get('downloaded_bytes') or 0
+            key = d.get('filename')
+            delta = done - seen.get(key, 0)
+            seen[key] = done
+            if delta > 0:
+                self.bucket.consume(delta)
+        return hook
@@ -3,16 +3,14 @@ import os
 import threading
 import queue
 import time
-import pandas as pd
 from PyQt5 import QtWidgets, QtGui, QtCore
-import fetcher_core
-import downloader_core
 import webbrowser
+import store_core
 
-# --- Spotify integration ---
-import requests
-import base64
+# Heavy dependencies (pandas, yt_dlp) are only imported through pipeline_core, either
+# when a job starts or by the background preload once the window is on screen.
 
+# --- Spotify integration ---
 # Fill in your Spotify app credentials here (for public playlist access):
 CLIENT_ID = 'YOUR_SPOTIFY_CLIENT_ID'
 CLIENT_SECRET = 'YOUR_SPOTIFY_CLIENT_SECRET'
@@ -20,6 +18,8 @@ CLIENT_SECRET = 'YOUR_SPOTIFY_CLIENT_SECRET'
 SPOTIFY_API_BASE = 'https://api.spotify.com/v1'
 SPOTIFY_PUBLIC_TOKEN = 'BQD0'  # Placeholder, not needed for public playlists
 
+PRELOAD_DELAY_MS = 200
+
 class SegmentedControl(QtWidgets.QWidget):
     modeChanged = QtCore.pyqtSignal(int)
     def __init__(self, labels, parent=None):
@@ -61,7 +61,7 @@ class SegmentedControl(QtWidgets.QWidget):
 
 class Worker(QtCore.QThread):
     progress_signal = QtCore.pyqtSignal(dict)
-    def __init__(self, input_csv, output_csv, failed_csv, pause_event, stop_event, download_audio=False, download_dir=None, thread_count=1, audio_format='opus'):
+    def __init__(self, input_csv, output_csv, failed_csv, pause_event, stop_event, download_audio=False, download_dir=None, thread_count=1, audio_format='opus', bandwidth_limit=None, priority='input', sync=False, remove_deleted=False):
         super().__init__()
         self.input_csv = input_csv
         self.output_csv = output_csv
@@ -72,108 +72,25 @@ class Worker(QtCore.QThread):
         self.download_dir = download_dir
         self.thread_count = thread_count
         self.audio_format = audio_format
+        self.bandwidth_limit = bandwidth_limit
+        self.priority = priority
+        self.sync = sync
+        self.remove_deleted = remove_deleted
     def run(self):
         try:
-            df = pd.read_csv(self.input_csv)
+            import pipeline_core  # pulls in pandas and yt_dlp; keep it off the startup path
         except Exception as e:
-            self.progress_signal.emit({'type': 'error', 'msg': f'Error reading input CSV: {e}'})
-            return
-        cols = set(df.columns)
-        def is_valid_yt(url):
-            s = str(url)
-            return s.startswith('http') and 'youtube' in s.lower()
-
-        if {'Artist Name(s)', 'Track Name'}.issubset(cols):
-            if 'url' in cols:
-                to_fetch = df[(df['url'].isna()) | (df['url'] == 'FAILED') | (~df['url'].apply(is_valid_yt))]
-                already_present = len(df) - len(to_fetch)
-                if len(to_fetch) == 0:
-                    self.progress_signal.emit({'type': 'log', 'msg': f'All tracks already have YouTube links ({already_present} present). Skipping fetch.'})
-                    if self.download_audio:
-                        urls = [str(u) for u in df['url'] if is_valid_yt(u)]
-                        self.progress_signal.emit({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
-                        downloader_core.download_audio(urls, self.download_dir, self.progress_signal.emit, self.pause_event, self.stop_event, self.thread_count, self.audio_format)
-                    return
-                else:
-                    self.progress_signal.emit({'type': 'log', 'msg': f'Fetching {len(to_fetch)} missing YouTube links (using {self.thread_count} threads)...'})
-                    temp_input = self.input_csv + '.tofetch.csv'
-                    to_fetch.to_csv(temp_input, index=False)
-                    fetcher_core.run_fetch(
-                        temp_input,
-                        self.output_csv,
-                        self.failed_csv,
-                        self.progress_signal.emit,
-                        self.pause_event,
-                        self.stop_event,
-                        self.thread_count
-                    )
-                    if self.download_audio:
-                        try:
-                            links_df = pd.read_csv(self.output_csv)
-                            urls = [str(u) for u in links_df['url'] if is_valid_yt(u)]
-                        except Exception as e:
-                            self.progress_signal.emit({'type': 'error', 'msg': f'Error reading output CSV: {e}'})
-                            return
-                        self.progress_signal.emit({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
-                        downloader_core.download_audio(urls, self.download_dir, self.progress_signal.emit, self.pause_event, self.stop_event, self.thread_count, self.audio_format)
-                    return
-            else:
-                self.progress_signal.emit({'type': 'log', 'msg': f'Fetching YouTube links for all {len(df)} tracks (using {self.thread_count} threads)...'})
-                fetcher_core.run_fetch(
-                    self.input_csv,
-                    self.output_csv,
-                    self.failed_csv,
-                    self.progress_signal.emit,
-                    self.pause_event,
-                    self.stop_event,
-                    self.thread_count
-                )
-                if self.download_audio:
-                    try:
-                        links_df = pd.read_csv(self.output_csv)
-                        urls = [str(u) for u in links_df['url'] if is_valid_yt(u)]
-                    except Exception as e:
-                        self.progress_signal.emit({'type': 'error', 'msg': f'Error reading output CSV: {e}'})
-                        return
-                    self.progress_signal.emit({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
-                    downloader_core.download_audio(urls, self.download_dir, self.progress_signal.emit, self.pause_event, self.stop_event, self.thread_count, self.audio_format)
-        elif 'url' in cols:
-            valid_urls = [str(u) for u in df['url'] if is_valid_yt(u)]
-            if len(valid_urls) == 0:
-                self.progress_signal.emit({'type': 'error', 'msg': 'No valid YouTube links found in input CSV.'})
-                return
-            self.progress_signal.emit({'type': 'log', 'msg': f'Starting audio download for {len(valid_urls)} tracks...'})
-            downloader_core.download_audio(valid_urls, self.download_dir, self.progress_signal.emit, self.pause_event, self.stop_event, self.thread_count, self.audio_format)
-        elif 'query' in cols:
-            to_fetch = df[(df['url'].isna()) | (df['url'] == 'FAILED') | (~df['url'].apply(is_valid_yt))] if 'url' in cols else df
-            already_present = len(df) - len(to_fetch)
-            if len(to_fetch) == 0:
-                self.progress_signal.emit({'type': 'log', 'msg': f'All failed links already have YouTube links ({already_present} present). Skipping fetch.'})
-                return
-            self.progress_signal.emit({'type': 'log', 'msg': f'Fetching {len(to_fetch)} failed/missing YouTube links (using {self.thread_count} threads)...'})
-            temp_input = self.input_csv + '.tofetch.csv'
-            to_fetch.to_csv(temp_input, index=False)
-            fetcher_core.run_fetch(
-                temp_input,
-                self.output_csv,
-                self.failed_csv,
-                self.progress_signal.emit,
-                self.pause_event,
-                self.stop_event,
-                self.thread_count
-            )
-            if self.download_audio:
-                try:
-                    links_df = pd.read_csv(self.output_csv)
-                    urls = [str(u) for u in links_df['url'] if is_valid_yt(u)]
-                except Exception as e:
-                    self.progress_signal.emit({'type': 'error', 'msg': f'Error reading output CSV: {e}'})
-                    return
-                self.progress_signal.emit({'type': 'log', 'msg': f'Starting audio download for {len(urls)} tracks...'})
-                downloader_core.download_audio(urls, self.download_dir, self.progress_signal.emit, self.pause_event, self.stop_event, self.thread_count, self.audio_format)
-        else:
-            self.progress_signal.emit({'type': 'error', 'msg': 'Unrecognized input CSV format.'})
+            self.progress_signal.emit({'type': 'error', 'msg': f'Could not load fetcher/downloader (missing dependency?): {e}'})
             return
+        pipeline_core.run_pipeline(self.input_csv, self.output_csv, self.failed_csv, self.progress_signal.emit, self.pause_event, self.stop_event,
+                                   self.download_audio, self.download_dir, self.thread_count, self.audio_format, self.bandwidth_limit, self.priority,
+                                   self.sync, self.remove_deleted)
+
+def _preload():
+    try:
+        import pipeline_core  # noqa: F401
+    except Exception:
+        pass  # surfaced properly when a job actually starts
 
 class SpotubeApp(QtWidgets.QWidget):
     def __init__(self):
@@ -191,6 +108,8 @@ class SpotubeApp(QtWidgets.QWidget):
         self.total = 0
         self.thread_count = 1
         self.audio_format = 'opus'
+        self.bandwidth_mbps = 0
+        self.priority = 'input'
         self._build_ui()
         self.setStyleSheet(self._main_stylesheet())
 
@@ -261,6 +180,14 @@ class SpotubeApp(QtWidgets.QWidget):
             color: #f5f5f7;
             border: 1px solid #444;
         }
+        QDoubleSpinBox {
+            font-size: 14pt;
+            padding: 6px 12px;
+            border-radius: 8px;
+            background: #23272a;
+            color: #f5f5f7;
+            border: 1px solid #444;
+        }
         QCheckBox {
             font-size: 13pt;
             color: #f5f5f7;
@@ -413,6 +340,52 @@ class SpotubeApp(QtWidgets.QWidget):
         format_row.addWidget(self.format_combo)
         box2_layout.addLayout(format_row)
 
+        # Bandwidth cap row
+        bandwidth_row = QtWidgets.QHBoxLayout()
+        bandwidth_row.setSpacing(10)
+        bandwidth_label = QtWidgets.QLabel('Max Bandwidth:')
+        bandwidth_label.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        self.bandwidth_spin = QtWidgets.QDoubleSpinBox()
+        self.bandwidth_spin.setRange(0, 1000)
+        self.bandwidth_spin.setDecimals(1)
+        self.bandwidth_spin.setSuffix(' MB/s')
+        self.bandwidth_spin.setSpecialValueText('Unlimited')
+        self.bandwidth_spin.setToolTip('Total download speed across all threads (0 = unlimited)')
+        self.bandwidth_spin.setFixedWidth(160)
+        self.bandwidth_spin.valueChanged.connect(self.update_bandwidth)
+        bandwidth_row.addWidget(bandwidth_label)
+        bandwidth_row.addWidget(self.bandwidth_spin)
+        box2_layout.addLayout(bandwidth_row)
+
+        # Download order row
+        priority_row = QtWidgets.QHBoxLayout()
+        priority_row.setSpacing(10)
+        priority_label = QtWidgets.QLabel('Download Order:')
+        priority_label.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        self.priority_combo = QtWidgets.QComboBox()
+        self.priority_combo.addItems(['input', 'shortest', 'smallest'])
+        self.priority_combo.setCurrentText('input')
+        self.priority_combo.setToolTip('Playlist order, shortest tracks first, or smallest files first')
+        self.priority_combo.setFixedWidth(160)
+        self.priority_combo.currentTextChanged.connect(self.update_priority)
+        priority_row.addWidget(priority_label)
+        priority_row.addWidget(self.priority_combo)
+        box2_layout.addLayout(priority_row)
+
+        # Sync mode row
+        sync_row = QtWidgets.QHBoxLayout()
+        sync_row.setSpacing(10)
+        self.sync_check = QtWidgets.QCheckBox('Sync changes only')
+        self.sync_check.setToolTip('Only process tracks added or changed since the last run of this playlist')
+        self.remove_deleted_check = QtWidgets.QCheckBox('Remove deleted tracks')
+        self.remove_deleted_check.setToolTip('Delete files for tracks that are no longer in the playlist')
+        self.remove_deleted_check.setEnabled(False)
+        self.sync_check.toggled.connect(self.remove_deleted_check.setEnabled)
+        sync_row.addWidget(self.sync_check)
+        sync_row.addWidget(self.remove_deleted_check)
+        sync_row.addStretch(1)
+        box2_layout.addLayout(sync_row)
+
         box2.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
         left_col.addWidget(box2)
         left_col.addStretch(1)
@@ -536,6 +509,12 @@ class SpotubeApp(QtWidgets.QWidget):
     def update_audio_format(self, value):
         self.audio_format = value
 
+    def update_bandwidth(self, value):
+        self.bandwidth_mbps = value
+
+    def update_priority(self, value):
+        self.priority = value
+
     def start_fetch(self):
         input_csv = self.input_edit.text().strip()
         download_dir = self.download_dir_edit.text().strip() or os.getcwd()
@@ -545,9 +524,7 @@ class SpotubeApp(QtWidgets.QWidget):
         if not os.path.exists(input_csv):
             QtWidgets.QMessageBox.critical(self, 'Error', 'Input CSV does not exist!')
             return
-        base = os.path.splitext(os.path.basename(input_csv))[0]
-        output_csv = os.path.join(download_dir, base + '_links.csv')
-        failed_csv = os.path.join(download_dir, base + '_failed.csv')
+        output_csv, failed_csv = store_core.playlist_outputs(input_csv, download_dir)
         self.log_area.clear()
         self.completed = self.skipped = self.failed = self.total = 0
         self.progress.setValue(0)
@@ -558,7 +535,10 @@ class SpotubeApp(QtWidgets.QWidget):
         self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         from spotube_app import Worker  # Avoid circular import
-        self.worker = Worker(input_csv, output_csv, failed_csv, self.pause_event, self.stop_event, True, download_dir, self.thread_count, self.audio_format)
+        bandwidth_limit = int(self.bandwidth_mbps * 1024 * 1024) or None
+        self.worker = Worker(input_csv, output_csv, failed_csv, self.pause_event, self.stop_event, True, download_dir, self.thread_count, self.audio_format,
+                             bandwidth_limit, self.priority, self.sync_check.isChecked(),
+                             self.sync_check.isChecked() and self.remove_deleted_check.isChecked())
         self.worker.progress_signal.connect(self.handle_progress)
         self.worker.finished.connect(self.on_finished)
         self.worker.start()
@@ -626,4 +606,6 @@ if __name__ == '__main__':
     app.setWindowIcon(QtGui.QIcon('logo.png'))
     window = SpotubeApp()
     window.show()
+    # Warm up the heavy imports after the first paint so Start responds instantly
+    QtCore.QTimer.singleShot(PRELOAD_DELAY_MS, lambda: threading.Thread(target=_preload, daemon=True).start())
     sys.exit(app.exec_()) 
\ No newline at end of file
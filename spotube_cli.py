@@ -0,0 +1,75 @@
+"""Headless entry point: fetch links and download audio without loading Qt.
+
+    python spotube_cli.py playlist.csv --dir ~/Music --threads 4 --format opus
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import store_core
+from retry_core import MAX_RETRY_ATTEMPTS
+
+
+def print_progress(msg):
+    if msg['type'] == 'log':
+        print(msg['msg'], flush=True)
+    elif msg['type'] == 'error':
+        print(msg['msg'], file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch YouTube links for a playlist CSV and download the audio.')
+    parser.add_argument('input_csv', help='Exportify CSV, a *_links.csv or a *_failed.csv')
+    parser.add_argument('--dir', dest='download_dir', help='download directory (default: next to the input CSV)')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--format', dest='audio_format', choices=['opus', 'flac', 'mp3'], default='opus')
+    parser.add_argument('--no-download', action='store_true', help='only fetch links')
+    parser.add_argument('--bandwidth', type=float, default=0, help='total download cap in MB/s (0 = unlimited)')
+    parser.add_argument('--order', dest='priority', choices=['input', 'shortest', 'smallest'], default='input')
+    parser.add_argument('--sync', action='store_true', help='only process tracks added or changed since the last run')
+    parser.add_argument('--remove-deleted', action='store_true', help='with --sync, delete files for tracks removed from the playlist')
+    parser.add_argument('--max-attempts', type=int, default=None,
+                        help='give up on a failed search after this many automatic retries (default: %d)' % MAX_RETRY_ATTEMPTS)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_csv):
+        parser.error(f'{args.input_csv} does not exist')
+    download_dir = args.download_dir or os.path.dirname(os.path.abspath(args.input_csv))
+    output_csv, failed_csv = store_core.playlist_outputs(args.input_csv, download_dir)
+
+    import pipeline_core  # deferred so --help and argument errors stay instant
+    pause_event = threading.Event()
+    stop_event = threading.Event()
+    errors = []
+
+    def on_progress(msg):
+        if msg['type'] == 'error':
+            errors.append(msg['msg'])
+        print_progress(msg)
+
+    def on_interrupt(signum, frame):
+        # Let running downloads wind down; a second Ctrl-C aborts immediately
+        print('Stopping after the current tracks... (Ctrl-C again to abort)', file=sys.stderr, flush=True)
+        stop_event.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        pipeline_core.run_pipeline(input_csv=args.input_csv, output_csv=output_csv, failed_csv=failed_csv,
+                                   progress_callback=on_progress, pause_event=pause_event, stop_event=stop_event,
+                                   download_audio=not args.no_download, download_dir=download_dir,
+                                   thread_count=args.threads, audio_format=args.audio_format,
+                                   bandwidth_limit=int(args.bandwidth * 1024 * 1024) or None, priority=args.priority,
+                                   sync=args.sync, remove_deleted=args.remove_deleted,
+                                   max_attempts=args.max_attempts or MAX_RETRY_ATTEMPTS)
+    except KeyboardInterrupt:
+        print('Aborted.', file=sys.stderr)
+        return 130
+    if stop_event.is_set():
+        return 130
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
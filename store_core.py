@@ -0,0 +1,172 @@
+import os
+import csv
+import time
+import sqlite3
+from library_core import video_id_from_url
+
+FAILED = 'FAILED'
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+SQLITE_CHUNK = 500  # stay well under SQLite's bound-parameter limit
+
+def is_resolved(url):
+    return bool(url) and url != FAILED
+
+
+class LinkStore:
+    """query -> url mapping shared by the fetcher and the downloader.
+
+    Backends keep one row per query (later results replace earlier ones) and
+    export back to the ``query,url`` CSV layout of ``<playlist>_links.csv``.
+    """
+    def lookup(self, queries):
+        """Return {query: url} for the given queries that have a row."""
+        raise NotImplementedError
+
+    def upsert(self, rows):
+        raise NotImplementedError
+
+    def rows(self):
+        """All (query, url) rows in first-insertion order."""
+        raise NotImplementedError
+
+    def failed(self):
+        """Queries whose stored url is FAILED."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def missing(self, queries):
+        found = self.lookup(queries)
+        return [q for q in queries if not is_resolved(found.get(q))]
+
+    def urls(self):
+        return [url for _, url in self.rows() if is_resolved(url)]
+
+    def export_csv(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['query', 'url'])
+            writer.writerows(self.rows())
+        os.replace(tmp, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_links_csv(path):
+    rows = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            query, url = row.get('query'), row.get('url') or FAILED
+            # Keep the first resolved link; a later FAILED row must not mask it
+            if query and (query not in rows or not is_resolved(rows[query])):
+                rows[query] = url
+    return rows
+
+
+class CsvLinkStore(LinkStore):
+    """Plain CSV backend; loads the file once and rewrites it deduplicated on close."""
+    def __init__(self, path):
+        self.path = path
+        self._rows = _read_links_csv(path) if os.path.exists(path) else {}
+        self._dirty = False
+
+    def lookup(self, queries):
+        return {q: self._rows[q] for q in queries if q in self._rows}
+
+    def upsert(self, rows):
+        for query, url in rows:
+            self._rows[query] = url
+            self._dirty = True
+
+    def rows(self):
+        return list(self._rows.items())
+
+    def failed(self):
+        return [q for q, url in self._rows.items() if url == FAILED]
+
+    def close(self):
+        if self._dirty:
+            self.export_csv(self.path)
+            self._dirty = False
+
+
+class SqliteLinkStore(LinkStore):
+    """SQLite backend indexed on query and video ID."""
+    def __init__(self, path, import_csv=None):
+        self.path = path
+        fresh = not os.path.exists(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS links (
+                query TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                video_id TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS links_video_id ON links (video_id);
+            CREATE INDEX IF NOT EXISTS links_failed ON links (query) WHERE url = 'FAILED';
+        """)
+        if fresh and import_csv and os.path.exists(import_csv):
+            self.upsert(_read_links_csv(import_csv).items())
+
+    def lookup(self, queries):
+        queries = list(queries)
+        found = {}
+        for i in range(0, len(queries), SQLITE_CHUNK):
+            chunk = queries[i:i + SQLITE_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(f'SELECT query, url FROM links WHERE query IN ({marks})', chunk))
+        return found
+
+    def upsert(self, rows):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO links (query, url, video_id, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(query) DO UPDATE SET url = excluded.url, video_id = excluded.video_id, updated = excluded.updated',
+                [(q, url, video_id_from_url(url) if is_resolved(url) else None, now) for q, url in rows])
+
+    def rows(self):
+        return self.conn.execute('SELECT query, url FROM links ORDER BY rowid').fetchall()
+
+    def urls(self):
+        return [url for (url,) in self.conn.execute('SELECT url FROM links WHERE url != ? ORDER BY rowid', (FAILED,))]
+
+    def failed(self):
+        # Literal predicate so the planner can use the partial links_failed index
+        return [q for (q,) in self.conn.execute("SELECT query FROM links WHERE url = 'FAILED'")]
+
+    def close(self):
+        self.conn.close()
+
+
+def playlist_name(input_csv):
+    """Playlist a CSV belongs to: Exportify exports, and the _links/_failed CSVs derived from them."""
+    name = os.path.splitext(os.path.basename(input_csv))[0]
+    for suffix in ('_links', '_failed'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def playlist_outputs(input_csv, download_dir):
+    """Return (output_csv, failed_csv) for the playlist input_csv belongs to."""
+    name = playlist_name(input_csv)
+    return os.path.join(download_dir, name + '_links.csv'), os.path.join(download_dir, name + '_failed.csv')
+
+
+def link_store_path(output_csv):
+    return os.path.splitext(output_csv)[0] + '.db'
+
+
+def open_link_store(path, import_csv=None):
+    """Open the backend matching path's extension; SQLite stores seed themselves from import_csv."""
+    if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+        return SqliteLinkStore(path, import_csv)
+    return CsvLinkStore(path)
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+
+# Exportify columns, most to least stable identity
+KEY_COLUMNS = ('Track URI', 'ISRC')
+FINGERPRINT_COLUMNS = ('Artist Name(s)', 'Track Name', 'Album Name', 'Duration (ms)')
+
+def _field(row, name):
+    value = row.get(name)
+    if value is None or value != value:  # missing column or NaN
+        return ''
+    return str(value).strip()
+
+def track_query(row):
+    return f"{row['Artist Name(s)']} - {row['Track Name']}"
+
+def track_key(row):
+    for column in KEY_COLUMNS:
+        value = _field(row, column)
+        if value:
+            return f'{column}:{value}'
+    return f'query:{track_query(row)}'
+
+def track_fingerprint(row):
+    joined = '\x1f'.join(_field(row, column) for column in FINGERPRINT_COLUMNS)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+def snapshot_path(output_csv):
+    return os.path.splitext(output_csv)[0] + '.snapshot.json'
+
+def build_snapshot(rows):
+    """Map each track key to its search query and fingerprint, preserving playlist order."""
+    return {track_key(r): {'query': track_query(r), 'fingerprint': track_fingerprint(r)} for r in rows}
+
+def load_snapshot(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_snapshot(path, snapshot):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=1)
+    os.replace(tmp, path)
+
+def diff_snapshots(old, new):
+    """Return lists of track keys: added, changed, removed and unchanged."""
+    delta = {'added': [], 'changed': [], 'removed': [], 'unchanged': []}
+    for key, entry in new.items():
+        if key not in old:
+            delta['added'].append(key)
+        elif old[key]['fingerprint'] != entry['fingerprint']:
+            delta['changed'].append(key)
+        else:
+            delta['unchanged'].append(key)
+    delta['removed'] = [key for key in old if key not in new]
+    return delta
+
+def describe(delta):
+    return (f"Sync: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+            f"{len(delta['removed'])} removed, {len(delta['unchanged'])} unchanged.")
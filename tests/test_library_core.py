@@ -0,0 +1,61 @@
+import os
+import time
+
+from library_core import AudioLibrary
+
+
+def _add(library, video_id, title):
+    with open(library.path_for(video_id, 'opus'), 'w') as f:
+        f.write(video_id)
+    library.add_entry(video_id, 'opus', title)
+
+
+def test_collect_garbage_keeps_entries_of_unmounted_playlist(tmp_path):
+    library = AudioLibrary(str(tmp_path / 'library'))
+    usb = tmp_path / 'usb' / 'A'
+    usb.mkdir(parents=True)
+    library.register_playlist(str(usb))
+    _add(library, 'aaa', 'Song A')
+    library.link_into('aaa', 'opus', str(usb))
+    library.save()
+
+    # Drive unplugged: the playlist folder disappears, another playlist runs GC
+    os.rename(tmp_path / 'usb', tmp_path / 'usb-unplugged')
+    other = AudioLibrary(library.root)
+    assert other.collect_garbage(before=time.time() + 1) == []
+    assert other.has('aaa', 'opus')
+
+    # Drive back: the existing link is reused, not duplicated as "Song A [aaa].opus"
+    os.rename(tmp_path / 'usb-unplugged', tmp_path / 'usb')
+    again = AudioLibrary(library.root)
+    assert again.link_into('aaa', 'opus', str(usb)) == 'Song A.opus'
+    assert sorted(os.listdir(usb)) == ['Song A.opus']
+
+
+def test_collect_garbage_removes_entries_whose_link_was_deleted(tmp_path):
+    library = AudioLibrary(str(tmp_path / 'library'))
+    playlist = tmp_path / 'B'
+    playlist.mkdir()
+    library.register_playlist(str(playlist))
+    _add(library, 'keep', 'Kept')
+    _add(library, 'gone', 'Gone')
+    library.link_into('keep', 'opus', str(playlist))
+    library.link_into('gone', 'opus', str(playlist))
+    os.remove(playlist / 'Gone.opus')
+
+    assert library.collect_garbage(before=time.time() + 1) == ['gone.opus']
+    assert library.has('keep', 'opus')
+    assert not library.has('gone', 'opus')
+
+
+def test_collect_garbage_ignores_unindexed_and_recent_files(tmp_path):
+    library = AudioLibrary(str(tmp_path / 'library'))
+    partial = os.path.join(library.root, 'def.webm.part')
+    with open(partial, 'w') as f:
+        f.write('partial')
+    started = time.time() - 60
+    _add(library, 'fresh', 'Fresh')
+
+    assert library.collect_garbage(before=started) == []
+    assert os.path.exists(partial)
+    assert library.has('fresh', 'opus')
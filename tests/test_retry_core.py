@@ -0,0 +1,20 @@
+from retry_core import RetryQueue
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    queue = RetryQueue(str(tmp_path / 'links.retry.json'), max_attempts=2)
+    queue.record_failure('song', 'no match', now=0)
+    assert queue.is_due('song', now=10 ** 9)
+    queue.record_failure('song', 'no match', now=0)
+    assert queue.is_given_up('song')
+    assert queue.due(now=10 ** 9) == []
+
+
+def test_manual_retries_do_not_count(tmp_path):
+    queue = RetryQueue(str(tmp_path / 'links.retry.json'), max_attempts=2)
+    queue.record_failure('song', 'no match', now=0)
+    for _ in range(3):
+        queue.record_failure('song', 'still no match', now=0, count_attempt=False)
+    assert not queue.is_given_up('song')
+    assert queue.entries['song']['attempts'] == 1
+    assert queue.entries['song']['reason'] == 'still no match'